@@ -5,7 +5,11 @@ from qrcode.image.styles.moduledrawers import CircleModuleDrawer, RoundedModuleD
 from qrcode.image.styles.colormasks import SolidFillColorMask
 from PIL import Image
 import base64
+import copy
+import struct
+import zlib
 from io import BytesIO
+from types import SimpleNamespace
 import validators
 
 # ENHANCED PAGE CONFIGURATION FOR SEO
@@ -254,8 +258,210 @@ style_map = {
     "Gapped Square": GappedSquareModuleDrawer()
 }
 
+# Data codewords per version (1-40) for each error correction level
+DATA_CODEWORDS = {
+    qrcode.constants.ERROR_CORRECT_L: (
+        19, 34, 55, 80, 108, 136, 156, 194, 232, 274,
+        324, 370, 428, 461, 523, 589, 647, 721, 795, 861,
+        932, 1006, 1094, 1174, 1276, 1370, 1468, 1531, 1631, 1735,
+        1843, 1955, 2071, 2191, 2306, 2434, 2566, 2702, 2812, 2956
+    ),
+    qrcode.constants.ERROR_CORRECT_M: (
+        16, 28, 44, 64, 86, 108, 124, 154, 182, 216,
+        254, 290, 334, 365, 415, 453, 507, 563, 627, 669,
+        714, 782, 860, 914, 1000, 1062, 1128, 1193, 1267, 1373,
+        1455, 1541, 1631, 1725, 1812, 1914, 1992, 2102, 2216, 2334
+    ),
+    qrcode.constants.ERROR_CORRECT_Q: (
+        13, 22, 34, 48, 62, 76, 88, 110, 132, 154,
+        180, 206, 244, 261, 295, 325, 367, 397, 445, 485,
+        512, 568, 614, 664, 718, 754, 808, 871, 911, 985,
+        1033, 1115, 1171, 1231, 1286, 1354, 1426, 1502, 1582, 1666
+    ),
+    qrcode.constants.ERROR_CORRECT_H: (
+        9, 16, 26, 36, 46, 60, 66, 86, 100, 122,
+        140, 158, 180, 197, 223, 253, 283, 313, 341, 385,
+        406, 442, 464, 514, 538, 596, 628, 661, 701, 745,
+        793, 845, 901, 961, 986, 1054, 1096, 1142, 1222, 1276
+    )
+}
+
+# Character count indicator bits per mode for versions 1-9, 10-26 and 27-40
+VERSION_RANGES = ((1, 9), (10, 26), (27, 40))
+COUNT_BITS = {
+    qrcode.util.MODE_NUMBER: (10, 12, 14),
+    qrcode.util.MODE_ALPHA_NUM: (9, 11, 13),
+    qrcode.util.MODE_8BIT_BYTE: (8, 16, 16)
+}
+
+# Payload bits for n characters in each mode
+def mode_data_bits(mode, n):
+    if mode == qrcode.util.MODE_NUMBER:
+        return 10 * (n // 3) + (0, 4, 7)[n % 3]
+    if mode == qrcode.util.MODE_ALPHA_NUM:
+        return 11 * (n // 2) + 6 * (n % 2)
+    return 8 * n
+
+def _max_chars(mode, capacity_bits, count_bits):
+    # Largest n whose header + payload still fits: inverse of mode_data_bits
+    available = max(capacity_bits - 4 - count_bits, 0)
+    if mode == qrcode.util.MODE_NUMBER:
+        groups, rest = divmod(available, 10)
+        n = 3 * groups + (2 if rest >= 7 else 1 if rest >= 4 else 0)
+    elif mode == qrcode.util.MODE_ALPHA_NUM:
+        pairs, rest = divmod(available, 11)
+        n = 2 * pairs + (1 if rest >= 6 else 0)
+    else:
+        n = available // 8
+    return min(n, (1 << count_bits) - 1)
+
+# Max characters per mode for every version and error correction level
+CAPACITY_TABLE = {
+    err: {
+        mode: tuple(
+            _max_chars(mode, codewords[v - 1] * 8, COUNT_BITS[mode][r])
+            for r, (first, last) in enumerate(VERSION_RANGES)
+            for v in range(first, last + 1)
+        )
+        for mode in COUNT_BITS
+    }
+    for err, codewords in DATA_CODEWORDS.items()
+}
+
+# Predict version and output size without rendering. Segments the payload
+# the same way qr.add_data() does so the result matches generate_qr().
+def estimate_qr(data, err_corr, box, bord):
+    chunks = list(qrcode.util.optimal_data_chunks(data, minimum=20))
+    codewords = DATA_CODEWORDS[err_corr]
+    needed_bits = None
+    for r, (first, last) in enumerate(VERSION_RANGES):
+        needed_bits = sum(
+            4 + COUNT_BITS[chunk.mode][r] + mode_data_bits(chunk.mode, len(chunk))
+            for chunk in chunks
+        )
+        for version in range(first, last + 1):
+            if needed_bits <= codewords[version - 1] * 8:
+                modules = 17 + 4 * version
+                return {
+                    "fits": True,
+                    "version": version,
+                    "modules": modules,
+                    "pixels": (modules + 2 * bord) * box,
+                    "needed_bits": needed_bits,
+                    "capacity_bits": codewords[version - 1] * 8
+                }
+    return {
+        "fits": False,
+        "version": None,
+        "modules": None,
+        "pixels": None,
+        "needed_bits": needed_bits,
+        "capacity_bits": codewords[-1] * 8
+    }
+
+# Peak memory (bytes) allowed per render. Outputs that would exceed this
+# on the full PIL path are streamed to PNG in row bands instead.
+RENDER_MEMORY_LIMIT = 32 * 1024 * 1024
+
+# Longest side (pixels) of the on-screen preview for streamed outputs
+PREVIEW_SIZE = 1000
+
+def _png_chunk(out, chunk_type, payload):
+    out.write(struct.pack(">I", len(payload)))
+    out.write(chunk_type)
+    out.write(payload)
+    out.write(struct.pack(">I", zlib.crc32(chunk_type + payload) & 0xFFFFFFFF))
+
+# Render the QR straight into `out` as an RGB PNG, one band of module rows
+# at a time, so memory scales with band height rather than image size.
+def stream_qr_png(qr, style, fg_rgb, bg_rgb, box, bord, out, logo=None, memory_limit=RENDER_MEMORY_LIMIT):
+    width = qr.modules_count
+    grid = width + 2 * bord
+    pixel_size = grid * box
+    stride = 3 * pixel_size
+
+    # Logo placement mirrors StyledPilImage.draw_embedded_image
+    logo_img, logo_offset, logo_bytes = None, 0, 0
+    if logo:
+        logo_width_ish = int(pixel_size * 0.25)
+        logo_offset = int((int(pixel_size / 2) - int(logo_width_ish / 2)) / box) * box
+        logo_width = pixel_size - logo_offset * 2
+        logo_img = Image.open(logo).resize((logo_width, logo_width), Image.Resampling.LANCZOS)
+        logo_bytes = logo_width * logo_width * 4
+
+    # Pillow keeps RGB(A) at 4 bytes/pixel and briefly holds two copies of
+    # the logo while resizing. Each band gets half of what is left, since the
+    # allocator doesn't always hand a freed band's memory to the next one.
+    # Scanlines are read out of the band a row at a time.
+    band_budget = (memory_limit - 2 * logo_bytes) // 2
+    rows_per_band = max(1, band_budget // (4 * pixel_size * box) - 1)
+
+    # Draw directly in final colours so no colour-mask pass is needed
+    color_mask = SolidFillColorMask(front_color=fg_rgb, back_color=bg_rgb)
+
+    out.write(b"\x89PNG\r\n\x1a\n")
+    _png_chunk(out, b"IHDR", struct.pack(">IIBBBBB", pixel_size, pixel_size, 8, 2, 0, 0, 0))
+    compressor = zlib.compressobj(6)
+
+    # Masks for a bytewise (row - prev) mod 256 on whole scanlines as ints:
+    # with the high bit forced on/off per byte, borrows never cross bytes
+    high = int.from_bytes(b"\x80" * stride, "big")
+    low = int.from_bytes(b"\x7f" * stride, "big")
+    prev = 0
+
+    for band_start in range(0, grid, rows_per_band):
+        band_rows = min(rows_per_band, grid - band_start)
+        band_top = band_start * box
+
+        # One blank module row of headroom above the band keeps drawer
+        # coordinates off 0: fractional insets (GappedSquare's delta) must
+        # round the same way they do at absolute positions on the full image
+        origin = band_top - box
+        band = Image.new("RGB", (pixel_size, (band_rows + 1) * box), bg_rgb)
+
+        # Fresh drawers per band: the style_map instances are shared by all
+        # sessions, and dropping them with the band frees its memory
+        canvas = SimpleNamespace(_img=band, mode="RGB", box_size=box, paint_color=fg_rgb, color_mask=color_mask)
+        module_drawer = copy.copy(style)
+        module_drawer.initialize(img=canvas)
+        eye_drawer = SquareModuleDrawer()
+        eye_drawer.initialize(img=canvas)
+
+        for r in range(max(band_start - bord, 0), min(band_start + band_rows - bord, width)):
+            y = (r + bord) * box - origin
+            for c in range(width):
+                is_eye = (r < 7 and c < 7) or (r < 7 and width - c < 8) or (width - r < 8 and c < 7)
+                drawer = eye_drawer if is_eye else module_drawer
+                if drawer.needs_neighbors:
+                    is_active = qr.active_with_neighbors(r, c)
+                else:
+                    is_active = bool(qr.modules[r][c])
+                x = (c + bord) * box
+                drawer.drawrect(((x, y), (x + box - 1, y + box - 1)), is_active)
+
+        # paste() clips to the band, so the logo needs no per-band copy
+        if logo_img is not None and logo_offset < origin + band.height and logo_offset + logo_img.height > band_top:
+            mask = logo_img if "A" in logo_img.getbands() else None
+            band.paste(logo_img, (logo_offset, logo_offset - origin), mask)
+
+        # Filter type 2 (Up): QR rows repeat `box` times, so most become zeros
+        data = []
+        for y in range(box, band.height):
+            row = int.from_bytes(band.crop((0, y, pixel_size, y + 1)).tobytes(), "big")
+            up = ((row | high) - (prev & low)) ^ ((row ^ prev ^ high) & high)
+            data.append(compressor.compress(b"\x02" + up.to_bytes(stride, "big")))
+            prev = row
+        drawer = None
+        del band, canvas, module_drawer, eye_drawer
+        data = b"".join(data)
+        if data:
+            _png_chunk(out, b"IDAT", data)
+
+    _png_chunk(out, b"IDAT", compressor.flush())
+    _png_chunk(out, b"IEND", b"")
+
 # Function to generate QR code with proper image handling
-def generate_qr(data, style, fg, bg, box, bord, err_corr, logo=None):
+def generate_qr(data, style, fg, bg, box, bord, err_corr, logo=None, memory_limit=RENDER_MEMORY_LIMIT):
     try:
         qr = qrcode.QRCode(
             version=None,
@@ -266,10 +472,26 @@ def generate_qr(data, style, fg, bg, box, bord, err_corr, logo=None):
         qr.add_data(data)
         qr.make(fit=True)
         
+        # Same rule qr.make_image enforces, checked here so both paths agree
+        if logo and err_corr != qrcode.constants.ERROR_CORRECT_H:
+            raise ValueError("Error correction level must be ERROR_CORRECT_H if an embedded image is provided")
+        
         # Convert hex colors to RGB
         fg_rgb = tuple(int(fg.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
         bg_rgb = tuple(int(bg.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
         
+        # Large print-resolution outputs: the PIL path peaks at up to ~3x the
+        # RGB raster, so stream the PNG in bands plus a small preview instead
+        grid = qr.modules_count + 2 * bord
+        pixel_size = grid * box
+        if pixel_size * pixel_size * 3 * 3 > memory_limit:
+            img_buffer = BytesIO()
+            stream_qr_png(qr, style, fg_rgb, bg_rgb, box, bord, img_buffer, logo, memory_limit)
+            preview_buffer = BytesIO()
+            preview_box = max(1, min(box, PREVIEW_SIZE // grid))
+            stream_qr_png(qr, style, fg_rgb, bg_rgb, preview_box, bord, preview_buffer, logo, memory_limit)
+            return img_buffer.getvalue(), qr.version, preview_buffer.getvalue()
+        
         # Create styled QR code
         if logo:
             qr_img = qr.make_image(
@@ -300,7 +522,7 @@ def generate_qr(data, style, fg, bg, box, bord, err_corr, logo=None):
         pil_image.save(img_buffer, format='PNG')
         img_bytes = img_buffer.getvalue()
         
-        return img_bytes, qr.version, pil_image
+        return img_bytes, qr.version, None
     except Exception as e:
         return None, str(e), None
 
@@ -324,6 +546,11 @@ with tab1:
                 st.success("✅ Valid URL")
             else:
                 st.warning("⚠️ URL may be invalid - QR will still be generated")
+            url_estimate = estimate_qr(url_input, error_map[error_correction], box_size, border)
+            if url_estimate["fits"]:
+                st.caption(f"📊 Predicted: Version {url_estimate['version']} · {url_estimate['pixels']}×{url_estimate['pixels']} px")
+            else:
+                st.error("❌ URL too long for any QR version at this error correction level")
     
     with col2:
         generate_btn_url = st.button("🎨 Generate", key="gen_url", type="primary")
@@ -336,7 +563,7 @@ with tab1:
                 logo_path = "temp_logo.png"
                 logo_img.save(logo_path)
             
-            img_bytes, version, pil_img = generate_qr(
+            img_bytes, version, preview_bytes = generate_qr(
                 url_input,
                 style_map[qr_style],
                 fg_color,
@@ -352,7 +579,9 @@ with tab1:
                 
                 col1, col2 = st.columns([2, 1])
                 with col1:
-                    st.image(img_bytes, caption=f"QR Code (Version {version})", use_container_width=True)
+                    st.image(preview_bytes or img_bytes, caption=f"QR Code (Version {version})", use_container_width=True)
+                    if preview_bytes:
+                        st.caption("🖨️ Print-size QR: preview shown, download for full resolution")
                 
                 with col2:
                     st.metric("📊 QR Version", version)
@@ -414,11 +643,13 @@ with tab2:
                 data_url = f'data:image/jpeg;base64,{img_b64}'
                 
                 encoded_kb = len(data_url) / 1024
+                estimate = estimate_qr(data_url, error_map[error_correction], box_size, border)
+                max_kb = CAPACITY_TABLE[error_map[error_correction]][qrcode.util.MODE_8BIT_BYTE][-1] / 1024
                 
-                if encoded_kb > 2.9:
-                    st.error(f"❌ Too large: {encoded_kb:.2f} KB. Max: 2.9 KB. Reduce quality/size!")
+                if not estimate["fits"]:
+                    st.error(f"❌ Too large: {encoded_kb:.2f} KB. Max at {error_correction}: {max_kb:.2f} KB. Reduce quality/size!")
                 else:
-                    st.success(f"✅ Encoded: {encoded_kb:.2f} KB")
+                    st.success(f"✅ Encoded: {encoded_kb:.2f} KB → Version {estimate['version']} ({estimate['pixels']}×{estimate['pixels']} px)")
                     
                     logo_path = None
                     if logo_file:
@@ -426,7 +657,7 @@ with tab2:
                         logo_path = "temp_logo.png"
                         logo_img.save(logo_path)
                     
-                    img_bytes, version, pil_img = generate_qr(
+                    img_bytes, version, preview_bytes = generate_qr(
                         data_url,
                         style_map[qr_style],
                         fg_color,
@@ -442,7 +673,9 @@ with tab2:
                         
                         col1, col2 = st.columns([2, 1])
                         with col1:
-                            st.image(img_bytes, use_container_width=True)
+                            st.image(preview_bytes or img_bytes, use_container_width=True)
+                            if preview_bytes:
+                                st.caption("🖨️ Print-size QR: preview shown, download for full resolution")
                         with col2:
                             st.download_button(
                                 "⬇️ Download",
@@ -477,11 +710,13 @@ with tab3:
                 data_url = f'data:application/octet-stream;base64,{file_b64}'
                 
                 encoded_kb = len(data_url) / 1024
+                estimate = estimate_qr(data_url, error_map[error_correction], box_size, border)
+                max_kb = CAPACITY_TABLE[error_map[error_correction]][qrcode.util.MODE_8BIT_BYTE][-1] / 1024
                 
-                if encoded_kb > 2.9:
-                    st.error(f"❌ File too large: {encoded_kb:.2f} KB. Max: 2.9 KB")
+                if not estimate["fits"]:
+                    st.error(f"❌ File too large: {encoded_kb:.2f} KB. Max at {error_correction}: {max_kb:.2f} KB")
                 else:
-                    st.success(f"✅ Encoded: {encoded_kb:.2f} KB")
+                    st.success(f"✅ Encoded: {encoded_kb:.2f} KB → Version {estimate['version']} ({estimate['pixels']}×{estimate['pixels']} px)")
                     
                     logo_path = None
                     if logo_file:
@@ -489,7 +724,7 @@ with tab3:
                         logo_path = "temp_logo.png"
                         logo_img.save(logo_path)
                     
-                    img_bytes, version, pil_img = generate_qr(
+                    img_bytes, version, preview_bytes = generate_qr(
                         data_url,
                         style_map[qr_style],
                         fg_color,
@@ -502,7 +737,9 @@ with tab3:
                     
                     if img_bytes:
                         st.markdown('<div class="success-box">✨ File QR Code Created!</div>', unsafe_allow_html=True)
-                        st.image(img_bytes, use_container_width=True)
+                        st.image(preview_bytes or img_bytes, use_container_width=True)
+                        if preview_bytes:
+                            st.caption("🖨️ Print-size QR: preview shown, download for full resolution")
                         
                         st.download_button(
                             "⬇️ Download QR",
@@ -526,7 +763,11 @@ with tab4:
     )
     
     if text_input:
-        st.caption(f"📝 {len(text_input)} characters")
+        text_estimate = estimate_qr(text_input, error_map[error_correction], box_size, border)
+        if text_estimate["fits"]:
+            st.caption(f"📝 {len(text_input)} characters · Version {text_estimate['version']} · {text_estimate['pixels']}×{text_estimate['pixels']} px")
+        else:
+            st.caption(f"📝 {len(text_input)} characters · ⚠️ Too long for this error correction level")
     
     generate_btn_text = st.button("🎨 Generate", key="gen_text", type="primary", use_container_width=True)
     
@@ -538,7 +779,7 @@ with tab4:
                 logo_path = "temp_logo.png"
                 logo_img.save(logo_path)
             
-            img_bytes, version, pil_img = generate_qr(
+            img_bytes, version, preview_bytes = generate_qr(
                 text_input,
                 style_map[qr_style],
                 fg_color,
@@ -554,7 +795,9 @@ with tab4:
                 
                 col1, col2 = st.columns([2, 1])
                 with col1:
-                    st.image(img_bytes, use_container_width=True)
+                    st.image(preview_bytes or img_bytes, use_container_width=True)
+                    if preview_bytes:
+                        st.caption("🖨️ Print-size QR: preview shown, download for full resolution")
                 with col2:
                     st.download_button(
                         "⬇️ Download",
@@ -610,7 +853,7 @@ END:VCARD"""
                 logo_path = "temp_logo.png"
                 logo_img.save(logo_path)
             
-            img_bytes, version, pil_img = generate_qr(
+            img_bytes, version, preview_bytes = generate_qr(
                 vcard,
                 style_map[qr_style],
                 fg_color,
@@ -626,7 +869,9 @@ END:VCARD"""
                 
                 col1, col2 = st.columns([2, 1])
                 with col1:
-                    st.image(img_bytes, use_container_width=True)
+                    st.image(preview_bytes or img_bytes, use_container_width=True)
+                    if preview_bytes:
+                        st.caption("🖨️ Print-size QR: preview shown, download for full resolution")
                     st.caption("📲 Scan to save contact instantly!")
                 
                 with col2:
@@ -658,7 +903,7 @@ with st.expander("📚 User Guide & Tips"):
         
         ### 💡 Best Practices
         - **URLs**: Perfect for menus, social media, websites
-        - **Images**: Keep under 2.9KB (low quality/small size)
+        - **Images**: Keep under ~2.9KB at L, ~1.2KB at H (low quality/small size)
         - **Files**: Small documents only (<100KB)
         - **Text**: WiFi passwords, messages, notes
         - **vCard**: Digital business cards